@@ -9,25 +9,29 @@ Single-file app with:
 - Auto Total / Percentage / GPA / Grade
 - Attendance marking & % calculation
 - Search & Grade filter
-- Export to CSV & Excel (optional, requires pandas + openpyxl)
+- Export to CSV & Excel
 """
 
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
 import sqlite3
-from contextlib import closing
+from contextlib import contextmanager
+from functools import lru_cache
 import datetime
+from decimal import Decimal
+import math
 import csv
-
-# Optional Excel export
-try:
-    import pandas as pd
-    PANDAS_AVAILABLE = True
-except:
-    PANDAS_AVAILABLE = False
+import re
+from concurrent.futures import ThreadPoolExecutor
+import zipfile
+from itertools import islice
+from xml.sax.saxutils import escape as xml_escape
 
 DB_FILE = "students_dark.db"
 
+# A marks entry: 0-100, optionally with decimals ("87", "92.5", "100.0")
+_MARK_RE = re.compile(r'^(?:100(?:\.0+)?|\d{1,2}(?:\.\d+)?)$')
+
 # -----------------------------------------------------------
 #  DARK THEME COLORS
 # -----------------------------------------------------------
@@ -49,214 +53,738 @@ LISTBOX_FG = "#ffffff"
 #  DATABASE FUNCTIONS
 # -----------------------------------------------------------
 
-def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    with closing(conn):
-        c = conn.cursor()
+# One connection and cursor are opened by init_db() and shared by every helper.
+# isolation_level=None puts sqlite3 in autocommit mode.
+_CONN = None
+_CUR = None
 
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS students (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            student_id TEXT UNIQUE,
-            name TEXT NOT NULL,
-            klass TEXT
-        )''')
+# Set by init_db() when SQLite was built with FTS5
+_FTS_ENABLED = False
 
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS subjects (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL
-        )''')
+DB_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_spill=OFF",
+)
 
+
+def init_db():
+    global _CONN, _CUR, _FTS_ENABLED
+    _CONN = sqlite3.connect(DB_FILE, check_same_thread=False, isolation_level=None,
+                            cached_statements=256)
+    _CONN.row_factory = sqlite3.Row
+    _CUR = _CONN.cursor()
+
+    c = _CUR
+    for pragma in DB_PRAGMAS:
+        c.execute(pragma)
+
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS students (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id TEXT UNIQUE,
+        name TEXT NOT NULL,
+        klass TEXT,
+        total REAL NOT NULL DEFAULT 0,
+        mcount INTEGER NOT NULL DEFAULT 0,
+        att_total INTEGER NOT NULL DEFAULT 0,
+        att_present INTEGER NOT NULL DEFAULT 0
+    )''')
+
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS subjects (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL
+    )''')
+
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS marks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_db_id INTEGER,
+        subject_db_id INTEGER,
+        marks REAL,
+        FOREIGN KEY(student_db_id) REFERENCES students(id),
+        FOREIGN KEY(subject_db_id) REFERENCES subjects(id)
+    )''')
+
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS attendance (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_db_id INTEGER,
+        date TEXT,
+        present INTEGER,
+        FOREIGN KEY(student_db_id) REFERENCES students(id)
+    )''')
+
+    # One mark per (student, subject); drop old duplicates before enforcing it
+    c.execute("SELECT 1 FROM sqlite_master WHERE type='index' AND name='idx_marks_stu_sub'")
+    if not c.fetchone():
         c.execute('''
-        CREATE TABLE IF NOT EXISTS marks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            student_db_id INTEGER,
-            subject_db_id INTEGER,
-            marks REAL,
-            FOREIGN KEY(student_db_id) REFERENCES students(id),
-            FOREIGN KEY(subject_db_id) REFERENCES subjects(id)
+        DELETE FROM marks WHERE id NOT IN (
+            SELECT MAX(id) FROM marks GROUP BY student_db_id, subject_db_id
         )''')
+        c.execute("CREATE UNIQUE INDEX idx_marks_stu_sub ON marks(student_db_id, subject_db_id)")
+
+    c.execute("CREATE INDEX IF NOT EXISTS idx_marks_sub ON marks(subject_db_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_att_stu ON attendance(student_db_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_students_name ON students(name COLLATE NOCASE)")
+
+    init_summary_columns(c)
+
+    # Index the derived grade so the grade filter is an index lookup; it is
+    # rebuilt whenever GRADE_SCALE (and so the expression) changes
+    grade_index_sql = f"CREATE INDEX idx_students_grade ON students({grade_sql_expr()})"
+    c.execute("SELECT sql FROM sqlite_master WHERE type='index' AND name='idx_students_grade'")
+    row = c.fetchone()
+    if row is None or row[0] != grade_index_sql:
+        c.execute("DROP INDEX IF EXISTS idx_students_grade")
+        c.execute(grade_index_sql)
+
+    _FTS_ENABLED = init_name_fts(c)
+
 
+SUMMARY_COLUMNS = (
+    "total REAL NOT NULL DEFAULT 0",
+    "mcount INTEGER NOT NULL DEFAULT 0",
+    "att_total INTEGER NOT NULL DEFAULT 0",
+    "att_present INTEGER NOT NULL DEFAULT 0",
+)
+
+# SUM() adds marks in index order, and float addition depends on order, so
+# stored totals are rounded to make them independent of subject ids
+MARKS_TOTAL_DIGITS = 6
+
+
+def marks_total_sql(student_ref):
+    return (f"ROUND(COALESCE((SELECT SUM(marks) FROM marks WHERE student_db_id = {student_ref}), 0), "
+            f"{MARKS_TOTAL_DIGITS})")
+
+
+def init_summary_columns(c):
+    # Marks total/count and attendance total/present are stored on each
+    # student and kept current by triggers, so listing students needs no
+    # aggregation. Older databases get the columns added and backfilled.
+    c.execute("PRAGMA table_info(students)")
+    existing = {row[1] for row in c.fetchall()}
+    missing = [col for col in SUMMARY_COLUMNS if col.split()[0] not in existing]
+
+    for col in missing:
+        c.execute(f"ALTER TABLE students ADD COLUMN {col}")
+
+    if missing:
         c.execute('''
-        CREATE TABLE IF NOT EXISTS attendance (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            student_db_id INTEGER,
-            date TEXT,
-            present INTEGER,
-            FOREIGN KEY(student_db_id) REFERENCES students(id)
-        )''')
+        UPDATE students SET
+            att_total = (SELECT COUNT(*) FROM attendance WHERE student_db_id = students.id),
+            att_present = COALESCE((SELECT SUM(present) FROM attendance
+                                    WHERE student_db_id = students.id), 0)
+        ''')
+
+    # Marks are re-summed rather than adjusted so REAL totals never drift
+    recalc_marks = f'''
+        UPDATE students SET
+            total = {marks_total_sql("{0}.student_db_id")},
+            mcount = (SELECT COUNT(*) FROM marks WHERE student_db_id = {{0}}.student_db_id)
+        WHERE id = {{0}}.student_db_id;
+    '''
+    marks_triggers = {
+        "marks_summary_ai": f"AFTER INSERT ON marks BEGIN {recalc_marks.format('new')} END",
+        "marks_summary_ad": f"AFTER DELETE ON marks BEGIN {recalc_marks.format('old')} END",
+        "marks_summary_au": (f"AFTER UPDATE ON marks BEGIN {recalc_marks.format('old')} "
+                             f"{recalc_marks.format('new')} END"),
+    }
+
+    # Triggers whose body changed (e.g. MARKS_TOTAL_DIGITS) are replaced and
+    # every total recomputed with the new definition
+    triggers_changed = False
+    for name, body in marks_triggers.items():
+        trigger_sql = f"CREATE TRIGGER {name} {body}"
+        c.execute("SELECT sql FROM sqlite_master WHERE type='trigger' AND name=?", (name,))
+        row = c.fetchone()
+        if row is None or row[0] != trigger_sql:
+            c.execute(f"DROP TRIGGER IF EXISTS {name}")
+            c.execute(trigger_sql)
+            triggers_changed = True
+
+    if missing or triggers_changed:
+        c.execute(f'''
+        UPDATE students SET
+            total = {marks_total_sql("students.id")},
+            mcount = (SELECT COUNT(*) FROM marks WHERE student_db_id = students.id)
+        ''')
+
+    # Attendance values are integers, so a running count is exact
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS attendance_summary_ai AFTER INSERT ON attendance BEGIN
+        UPDATE students SET att_total = att_total + 1,
+                            att_present = att_present + COALESCE(new.present, 0)
+        WHERE id = new.student_db_id;
+    END''')
+
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS attendance_summary_ad AFTER DELETE ON attendance BEGIN
+        UPDATE students SET att_total = att_total - 1,
+                            att_present = att_present - COALESCE(old.present, 0)
+        WHERE id = old.student_db_id;
+    END''')
+
+
+def init_name_fts(c):
+    # Full-text index over student names, kept in sync by triggers.
+    # Returns False when SQLite was built without FTS5.
+    c.execute("SELECT 1 FROM sqlite_master WHERE name='students_fts'")
+    fts_is_new = c.fetchone() is None
+    try:
+        c.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS students_fts
+        USING fts5(name, content='students', content_rowid='id')''')
+    except sqlite3.OperationalError:
+        return False
+
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS students_fts_ai AFTER INSERT ON students BEGIN
+        INSERT INTO students_fts(rowid, name) VALUES (new.id, new.name);
+    END''')
+
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS students_fts_ad AFTER DELETE ON students BEGIN
+        INSERT INTO students_fts(students_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    END''')
+
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS students_fts_au AFTER UPDATE OF name ON students BEGIN
+        INSERT INTO students_fts(students_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO students_fts(rowid, name) VALUES (new.id, new.name);
+    END''')
+
+    if fts_is_new:
+        c.execute("INSERT INTO students_fts(students_fts) VALUES ('rebuild')")
+
+    return True
+
 
-        conn.commit()
+def get_cursor():
+    # Single cursor reused by every helper; results are always fetched
+    # before the next statement runs
+    return _CUR
 
 
-def get_conn():
-    return sqlite3.connect(DB_FILE)
+def close_db():
+    # Checkpoints the WAL back into the database file on the way out
+    global _CONN, _CUR
+    if _CONN is None:
+        return
+    _CUR.close()
+    _CONN.close()
+    _CONN = _CUR = None
+
+
+@contextmanager
+def transaction():
+    # The connection is in autocommit mode, so group writes explicitly
+    c = get_cursor()
+    c.execute("BEGIN")
+    try:
+        yield c
+    except:
+        c.execute("ROLLBACK")
+        raise
+    c.execute("COMMIT")
+
+
+# Bumped by every write so the GUI can tell when cached summaries are stale
+_REVISIONS = {"students": 0, "marks": 0, "attendance": 0}
+
+
+def bump_revision(*tables):
+    for table in tables:
+        _REVISIONS[table] += 1
+
+
+def data_revision():
+    return tuple(_REVISIONS.values())
+
+
+# SQL used by the helpers below. Keeping each statement as one shared string
+# lets sqlite3's statement cache hand back the already-prepared statement.
+
+SQL_INSERT_STUDENT = "INSERT INTO students (student_id, name, klass) VALUES (?, ?, ?)"
+SQL_UPDATE_STUDENT = "UPDATE students SET student_id=?, name=?, klass=? WHERE id=?"
+SQL_DELETE_STUDENT = "DELETE FROM students WHERE id=?"
+SQL_DELETE_STUDENT_MARKS = "DELETE FROM marks WHERE student_db_id=?"
+SQL_DELETE_STUDENT_ATTENDANCE = "DELETE FROM attendance WHERE student_db_id=?"
+
+SQL_SELECT_STUDENT_SUMMARY = \
+    "SELECT id, student_id, name, klass, total, mcount, att_total, att_present FROM students"
+SQL_STUDENT_SUMMARY_BY_ID = SQL_SELECT_STUDENT_SUMMARY + " WHERE id=?"
+
+SQL_INSERT_SUBJECT = "INSERT OR IGNORE INTO subjects (name) VALUES (?)"
+SQL_RENAME_SUBJECT = "UPDATE subjects SET name=? WHERE id=?"
+SQL_DELETE_SUBJECT = "DELETE FROM subjects WHERE id=?"
+SQL_LIST_SUBJECTS = "SELECT id, name FROM subjects ORDER BY name"
+
+SQL_UPSERT_MARK = '''
+INSERT INTO marks (student_db_id, subject_db_id, marks) VALUES (?, ?, ?)
+ON CONFLICT(student_db_id, subject_db_id) DO UPDATE SET marks=excluded.marks
+'''
+
+# Rows per multi-row marks UPSERT: 200 x 3 parameters stays under SQLite's
+# historic 999 bound-parameter limit
+MARKS_UPSERT_CHUNK = 200
+SQL_MARKS_FOR_STUDENT = '''
+SELECT subjects.name, marks.marks
+FROM marks
+JOIN subjects ON subjects.id = marks.subject_db_id
+WHERE marks.student_db_id = ?
+ORDER BY subjects.name
+'''
+SQL_MARKS_BY_SUBJECT_FOR_STUDENT = "SELECT subject_db_id, marks FROM marks WHERE student_db_id=?"
+SQL_DELETE_SUBJECT_MARKS = "DELETE FROM marks WHERE subject_db_id=?"
+
+SQL_INSERT_ATTENDANCE = "INSERT INTO attendance (student_db_id, date, present) VALUES (?, ?, ?)"
 
 
 def add_student_to_db(student_id, name, klass):
-    conn = get_conn()
-    with closing(conn):
-        c = conn.cursor()
-        c.execute("INSERT INTO students (student_id, name, klass) VALUES (?, ?, ?)",
-                  (student_id, name, klass))
-        conn.commit()
-        return c.lastrowid
+    c = get_cursor()
+    c.execute(SQL_INSERT_STUDENT, (student_id, name, klass))
+    bump_revision("students")
+    return c.lastrowid
 
 
 def update_student_in_db(db_id, student_id, name, klass):
-    conn = get_conn()
-    with closing(conn):
-        c = conn.cursor()
-        c.execute("UPDATE students SET student_id=?, name=?, klass=? WHERE id=?",
-                  (student_id, name, klass, db_id))
-        conn.commit()
+    c = get_cursor()
+    c.execute(SQL_UPDATE_STUDENT, (student_id, name, klass, db_id))
+    bump_revision("students")
 
 
 def delete_student_from_db(db_id):
-    conn = get_conn()
-    with closing(conn):
-        c = conn.cursor()
-        c.execute("DELETE FROM students WHERE id=?", (db_id,))
-        c.execute("DELETE FROM marks WHERE student_db_id=?", (db_id,))
-        c.execute("DELETE FROM attendance WHERE student_db_id=?", (db_id,))
-        conn.commit()
+    with transaction() as c:
+        c.execute(SQL_DELETE_STUDENT, (db_id,))
+        c.execute(SQL_DELETE_STUDENT_MARKS, (db_id,))
+        c.execute(SQL_DELETE_STUDENT_ATTENDANCE, (db_id,))
+    bump_revision("students", "marks", "attendance")
+
+
+def name_search_clause(query):
+    # WHERE clause + params matching students by name. With FTS5 every word
+    # of the query must be a prefix of a word in the name ("mu gup" finds
+    # "Muskan Gupta"); without it, or for an empty query, plain LIKE is used.
+    words = query.split()
+    if _FTS_ENABLED and words:
+        match = " ".join('"%s"*' % w.replace('"', '""') for w in words)
+        return ("id IN (SELECT rowid FROM students_fts WHERE students_fts MATCH ?)",
+                (match,))
+    return "name LIKE ?", (f"%{query}%",)
+
+
+@lru_cache(maxsize=None)
+def student_summary_select(search_where, has_grade):
+    # The list only ever runs a handful of SELECT shapes (with/without a name
+    # search, with/without a grade), so each is assembled once and reused with
+    # identical text, which is what sqlite3's statement cache keys on
+    conditions = []
+    if search_where:
+        conditions.append(search_where)
+    if has_grade:
+        conditions.append(f"{grade_sql_expr()} = ?")
+
+    sql = SQL_SELECT_STUDENT_SUMMARY
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return sql + " ORDER BY name"
+
+
+def student_summary_sql(query="", grade="All"):
+    where, params = name_search_clause(query) if query else (None, ())
+    if grade != "All":
+        params += (grade,)
+    return student_summary_select(where, grade != "All"), params
+
+
+def fetch_student_summary(query="", grade="All"):
+    c = get_cursor()
+    c.execute(*student_summary_sql(query, grade))
+    return c.fetchall()
+
+
+def fetch_student_summary_by_id(student_db_id):
+    # Same stored totals the table is graded from, for one student
+    c = get_cursor()
+    c.execute(SQL_STUDENT_SUMMARY_BY_ID, (student_db_id,))
+    return c.fetchone()
+
+
+# Rows pulled from the cursor per fetchmany() call during an export
+EXPORT_FETCH_ROWS = 50000
+
+
+def iter_student_export_rows(conn, query, grade="All"):
+    # Yields finished table rows straight off a cursor, in bounded chunks, for
+    # exports that should not hold the whole roster in memory
+    c = conn.cursor()
+    try:
+        c.execute(*student_summary_sql(query, grade))
+        while True:
+            chunk = c.fetchmany(EXPORT_FETCH_ROWS)
+            if not chunk:
+                break
+            for row in chunk:
+                yield summary_row(row, calculate_grade_from_totals(row["total"], row["mcount"]))
+    finally:
+        c.close()
 
 
-def list_students_from_db():
-    conn = get_conn()
-    with closing(conn):
-        c = conn.cursor()
-        c.execute("SELECT id, student_id, name, klass FROM students ORDER BY name")
-        return c.fetchall()
+def add_subject_to_db(name):
+    c = get_cursor()
+    c.execute(SQL_INSERT_SUBJECT, (name,))
 
 
-def find_students_by_name(name):
-    conn = get_conn()
-    with closing(conn):
-        c = conn.cursor()
-        c.execute("SELECT id, student_id, name, klass FROM students WHERE name LIKE ? ORDER BY name",
-                  (f"%{name}%",))
-        return c.fetchall()
+def rename_subject_in_db(subject_db_id, name):
+    c = get_cursor()
+    c.execute(SQL_RENAME_SUBJECT, (name, subject_db_id))
 
 
-def add_subject_to_db(name):
-    conn = get_conn()
-    with closing(conn):
-        c = conn.cursor()
-        c.execute("INSERT OR IGNORE INTO subjects (name) VALUES (?)", (name,))
-        conn.commit()
+def list_subjects_from_db():
+    c = get_cursor()
+    c.execute(SQL_LIST_SUBJECTS)
+    return c.fetchall()
 
 
-def list_subjects_from_db():
-    conn = get_conn()
-    with closing(conn):
-        c = conn.cursor()
-        c.execute("SELECT id, name FROM subjects ORDER BY name")
-        return c.fetchall()
-
-
-def set_mark_in_db(student_db_id, subject_db_id, marks):
-    conn = get_conn()
-    with closing(conn):
-        c = conn.cursor()
-        c.execute("SELECT id FROM marks WHERE student_db_id=? AND subject_db_id=?",
-                  (student_db_id, subject_db_id))
-        row = c.fetchone()
+@lru_cache(maxsize=None)
+def upsert_marks_sql(n_rows):
+    # SQL_UPSERT_MARK with n_rows value tuples, so a chunk is bound and
+    # stepped as one statement
+    values = ", ".join(["(?, ?, ?)"] * n_rows)
+    return SQL_UPSERT_MARK.replace("(?, ?, ?)", values)
 
-        if row:
-            c.execute("UPDATE marks SET marks=? WHERE id=?", (marks, row[0]))
-        else:
-            c.execute("INSERT INTO marks (student_db_id, subject_db_id, marks) VALUES (?, ?, ?)",
-                      (student_db_id, subject_db_id, marks))
 
-        conn.commit()
+def set_marks_bulk(student_db_id, pairs):
+    params = [v for subject_db_id, marks in pairs for v in (student_db_id, subject_db_id, marks)]
+    step = MARKS_UPSERT_CHUNK * 3
+    with transaction() as c:
+        for start in range(0, len(params), step):
+            chunk = params[start:start + step]
+            c.execute(upsert_marks_sql(len(chunk) // 3), chunk)
+    bump_revision("marks")
 
 
 def get_marks_for_student_from_db(student_db_id):
-    conn = get_conn()
-    with closing(conn):
-        c = conn.cursor()
-        c.execute('''
-        SELECT subjects.name, marks.marks
-        FROM marks
-        JOIN subjects ON subjects.id = marks.subject_db_id
-        WHERE marks.student_db_id = ?
-        ORDER BY subjects.name
-        ''', (student_db_id,))
-        return c.fetchall()
-
+    c = get_cursor()
+    c.execute(SQL_MARKS_FOR_STUDENT, (student_db_id,))
+    return c.fetchall()
 
-def delete_marks_for_subject(subject_db_id):
-    conn = get_conn()
-    with closing(conn):
-        c = conn.cursor()
-        c.execute("DELETE FROM marks WHERE subject_db_id=?", (subject_db_id,))
-        conn.commit()
 
+def get_marks_by_subject_for_student(student_db_id):
+    # {subject_db_id: marks} via the (student, subject) index, no join needed
+    c = get_cursor()
+    c.execute(SQL_MARKS_BY_SUBJECT_FOR_STUDENT, (student_db_id,))
+    return dict(c.fetchall())
 
-def add_attendance_to_db(student_db_id, date_str, present):
-    conn = get_conn()
-    with closing(conn):
-        c = conn.cursor()
-        c.execute("INSERT INTO attendance (student_db_id, date, present) VALUES (?, ?, ?)",
-                  (student_db_id, date_str, 1 if present else 0))
-        conn.commit()
 
+def delete_subject_from_db(subject_db_id):
+    with transaction() as c:
+        c.execute(SQL_DELETE_SUBJECT, (subject_db_id,))
+        c.execute(SQL_DELETE_SUBJECT_MARKS, (subject_db_id,))
+    bump_revision("marks")
 
-def get_attendance_percent_from_db(student_db_id):
-    conn = get_conn()
-    with closing(conn):
-        c = conn.cursor()
-        c.execute("SELECT COUNT(*) FROM attendance WHERE student_db_id=?", (student_db_id,))
-        total = c.fetchone()[0]
 
-        if total == 0:
-            return 0.0
+def add_attendance_to_db(student_db_id, date_str, present):
+    c = get_cursor()
+    c.execute(SQL_INSERT_ATTENDANCE, (student_db_id, date_str, 1 if present else 0))
+    bump_revision("attendance")
 
-        c.execute("SELECT SUM(present) FROM attendance WHERE student_db_id=?", (student_db_id,))
-        present = c.fetchone()[0] or 0
 
-        return round((present / total) * 100, 2)
+def add_attendance_bulk(rows):
+    # rows: iterable of (student_db_id, date_str, present)
+    with transaction() as c:
+        c.executemany(SQL_INSERT_ATTENDANCE,
+                      ((db_id, date_str, 1 if present else 0) for db_id, date_str, present in rows))
+    bump_revision("attendance")
 
 
 # -----------------------------------------------------------
 #  GRADING LOGIC
 # -----------------------------------------------------------
 
-def calculate_total_percentage_gpa_grade(marks_list):
-    if not marks_list:
+# (minimum percentage, GPA, grade), highest first; anything lower is an F
+GRADE_SCALE = (
+    (90, 4.0, "A+"),
+    (80, 3.7, "A"),
+    (70, 3.0, "B"),
+    (60, 2.0, "C"),
+    (50, 1.0, "D"),
+)
+
+
+def lowest_percentage_for(min_pct):
+    # Smallest float that calculate_grade_from_totals rounds up to min_pct
+    p = min_pct - 0.005
+    while round(p, 2) >= min_pct:
+        p = math.nextafter(p, -math.inf)
+    while round(p, 2) < min_pct:
+        p = math.nextafter(p, math.inf)
+    return p
+
+
+@lru_cache(maxsize=None)
+def grade_sql_expr():
+    # The grade of a students row as a SQL expression. It repeats the float
+    # arithmetic of calculate_grade_from_totals and compares against the exact
+    # rounding boundaries, so SQL and Python always agree on a grade.
+    pct = "((total / (100.0 * mcount)) * 100)"
+    whens = " ".join(f"WHEN {pct} >= {lowest_percentage_for(min_pct)!r} THEN '{grade}'"
+                     for min_pct, _, grade in GRADE_SCALE)
+    return f"(CASE WHEN mcount = 0 THEN 'N/A' {whens} ELSE 'F' END)"
+
+
+def calculate_grade_from_totals(total, count):
+    if not count:
         return 0, 0, 0, 0, "N/A"
 
-    total = 0
-    max_total = 100 * len(marks_list)
-
-    for _, m in marks_list:
-        try:
-            total += float(m)
-        except:
-            total += 0
+    max_total = 100 * count
 
     percentage = round((total / max_total) * 100, 2) if max_total > 0 else 0.0
 
-    if percentage >= 90:
-        return total, max_total, percentage, 4.0, "A+"
-    if percentage >= 80:
-        return total, max_total, percentage, 3.7, "A"
-    if percentage >= 70:
-        return total, max_total, percentage, 3.0, "B"
-    if percentage >= 60:
-        return total, max_total, percentage, 2.0, "C"
-    if percentage >= 50:
-        return total, max_total, percentage, 1.0, "D"
+    for min_pct, gpa, grade in GRADE_SCALE:
+        if percentage >= min_pct:
+            return total, max_total, percentage, gpa, grade
 
     return total, max_total, percentage, 0.0, "F"
 
 
+def calculate_attendance_percent(total, present):
+    if total == 0:
+        return 0.0
+    return round((present / total) * 100, 2)
+
+
+def format_mark(value):
+    # Stored mark as entry text _MARK_RE accepts; str() would show small
+    # values such as 0.00001 in exponent form ("1e-05")
+    return format(Decimal(repr(value)), "f")
+
+
+def summary_row(row, graded):
+    # One student table row from a student summary row and its grading tuple
+    total, max_total, percentage, gpa, grade = graded
+    attendance = calculate_attendance_percent(row["att_total"], row["att_present"])
+    return (row["id"], row["student_id"], row["name"], row["klass"],
+            total, percentage, gpa, grade, attendance)
+
+
+# -----------------------------------------------------------
+#  EXCEL WRITERS
+# -----------------------------------------------------------
+
+# The export is a single unstyled sheet, so the .xlsx package is written
+# by hand: a few fixed XML parts plus the sheet, zipped together.
+
+_XLSX_FIXED_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+_XLSX_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_XLSX_SHEET_END = '</sheetData></worksheet>'
+
+
+def xlsx_column_name(index):
+    # 0 -> "A", 25 -> "Z", 26 -> "AA"
+    name = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        name = chr(65 + rem) + name
+    return name
+
+
+# Rows are turned into XML a block at a time, one column at a time, so the
+# numeric/text decision is made once per column instead of once per cell
+XLSX_BLOCK_ROWS = 2000
+
+
+# Control characters XML 1.0 does not allow, even escaped; a sheet containing
+# one cannot be opened, so they are dropped from text cells
+_XML_INVALID_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def xlsx_text(value):
+    return xml_escape(_XML_INVALID_RE.sub("", str(value)))
+
+
+def xlsx_column_cells(column, row_nums, values, numeric):
+    # Cell XML for one column of a block; empty cells become ""
+    if numeric:
+        return [f'<c r="{column}{n}"><v>{v!r}</v></c>' if v is not None else ""
+                for n, v in zip(row_nums, values)]
+    return [f'<c r="{column}{n}" t="inlineStr"><is><t xml:space="preserve">'
+            f'{xlsx_text(v)}</t></is></c>' if v is not None and v != "" else ""
+            for n, v in zip(row_nums, values)]
+
+
+def xlsx_block_xml(first_row, columns, numeric_columns, block):
+    row_nums = range(first_row, first_row + len(block))
+    cells = [xlsx_column_cells(column, row_nums, values, i in numeric_columns)
+             for i, (column, values) in enumerate(zip(columns, zip(*block)))]
+    return "".join(f'<row r="{n}">{"".join(row)}</row>'
+                   for n, row in zip(row_nums, zip(*cells)))
+
+
+def write_xlsx(fp, headers, rows, numeric_columns=(), progress=None):
+    # numeric_columns holds the indexes of columns written as numbers; all
+    # other columns are written as text. progress, if given, is called with
+    # the number of data rows written so far after every block.
+    columns = [xlsx_column_name(i) for i in range(len(headers))]
+    rows = iter(rows)
+
+    with zipfile.ZipFile(fp, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, xml in _XLSX_FIXED_PARTS.items():
+            zf.writestr(name, xml)
+
+        # The sheet size is unknown up front, so allow it to pass 4 GiB
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(_XLSX_SHEET_START.encode("utf-8"))
+            sheet.write(xlsx_block_xml(1, columns, (), [headers]).encode("utf-8"))
+            row_num = 2
+            while True:
+                block = list(islice(rows, XLSX_BLOCK_ROWS))
+                if not block:
+                    break
+                sheet.write(xlsx_block_xml(row_num, columns, numeric_columns, block).encode("utf-8"))
+                row_num += len(block)
+                if progress is not None:
+                    progress(row_num - 2)
+            sheet.write(_XLSX_SHEET_END.encode("utf-8"))
+
+
+EXPORT_HEADERS = ("DB_ID", "Student ID", "Name", "Class",
+                  "Total", "Percentage", "GPA", "Grade", "Attendance%")
+
+# DB_ID, Total, Percentage, GPA and Attendance% in the exported table
+EXPORT_NUMERIC_COLUMNS = frozenset((0, 4, 5, 6, 8))
+
+
+def export_students_xlsx(fp, query, grade_filter, progress=None):
+    # Runs off the Tk thread, so it opens its own connection and streams
+    # rows from the cursor into the sheet
+    conn = sqlite3.connect(DB_FILE)
+    conn.row_factory = sqlite3.Row
+    rows = iter_student_export_rows(conn, query, grade_filter)
+    try:
+        write_xlsx(fp, EXPORT_HEADERS, rows, EXPORT_NUMERIC_COLUMNS, progress)
+    finally:
+        # A failed write leaves the generator suspended on its last chunk;
+        # close it so the cursor and rows go now, not whenever it is collected
+        rows.close()
+        conn.close()
+
+
 # -----------------------------------------------------------
 #  GUI – DARK THEME IMPLEMENTATION
 # -----------------------------------------------------------
 
+def create_button(parent, text, cmd, w=12):
+    # Dark theme button shared by the main window and its dialogs
+    btn = tk.Button(parent, text=text, width=w, command=cmd,
+                    bg=BTN_BG, fg=TEXT_COLOR, activebackground=BTN_HOVER,
+                    activeforeground=TEXT_COLOR, relief="flat", bd=2)
+    return btn
+
+
+class ConfirmDialog:
+    # Dark-themed replacement for askyesno/showinfo. The window is built once
+    # and only hidden between uses; show() returns straight away and the Yes
+    # (or OK) button runs the callback, so no nested event loop is spun.
+
+    def __init__(self, master):
+        self.master = master
+        self.top = tk.Toplevel(master, bg=FRAME_BG)
+        self.top.withdraw()
+        self.top.resizable(False, False)
+        self.top.transient(master)
+        self.top.protocol("WM_DELETE_WINDOW", self.hide)
+
+        self.label = tk.Label(self.top, bg=FRAME_BG, fg=TEXT_COLOR,
+                              justify="left", wraplength=360)
+        self.label.pack(padx=20, pady=(16, 10))
+
+        buttons = tk.Frame(self.top, bg=FRAME_BG)
+        buttons.pack(pady=(0, 12))
+        self.btn_yes = create_button(buttons, "Yes", self.on_yes, w=8)
+        self.btn_yes.pack(side=tk.LEFT, padx=5)
+        self.btn_no = create_button(buttons, "No", self.hide, w=8)
+
+        self.top.bind("<Return>", lambda e: self.on_yes())
+        self.top.bind("<Escape>", lambda e: self.hide())
+        self._callback = None
+
+    def show(self, title, message, on_yes=None):
+        # Without on_yes this is an information box with a single OK button
+        self._callback = on_yes
+        self.top.title(title)
+        self.label.config(text=message)
+        if on_yes is None:
+            self.btn_yes.config(text="OK")
+            self.btn_no.pack_forget()
+        else:
+            self.btn_yes.config(text="Yes")
+            self.btn_no.pack(side=tk.LEFT, padx=5)
+
+        self.top.update_idletasks()
+        x = self.master.winfo_rootx() + (self.master.winfo_width() - self.top.winfo_reqwidth()) // 2
+        y = self.master.winfo_rooty() + (self.master.winfo_height() - self.top.winfo_reqheight()) // 3
+        self.top.geometry(f"+{x}+{y}")
+        self.top.deiconify()
+        self.top.lift()
+        self.btn_yes.focus_set()
+
+    def hide(self):
+        self.top.withdraw()
+
+    def on_yes(self):
+        callback = self._callback
+        self.hide()
+        if callback is not None:
+            callback()
+
+
 class StudentGradingApp:
     def __init__(self, master):
         self.master = master
@@ -265,6 +793,10 @@ class StudentGradingApp:
         master.configure(bg=BG)
         master.protocol("WM_DELETE_WINDOW", self.on_close)
 
+        # Marks entry per subject id, rebuilt by refresh_subjects
+        self.marks_entry_vars = {}
+        self._clear_marks_script = ""
+
         # ---------------------------
         # Widget Style Overrides
         # ---------------------------
@@ -312,9 +844,10 @@ class StudentGradingApp:
                                      bg=ENTRY_BG, fg=ENTRY_FG, insertbackground="white")
         self.search_entry.pack(side=tk.LEFT, padx=6)
         self.search_entry.bind("<Return>", lambda e: self.refresh_student_list())
+        self.search_entry.bind("<KeyRelease>", lambda e: self.schedule_refresh())
 
-        self.create_button(top_frame, "Search", self.refresh_student_list).pack(side=tk.LEFT, padx=6)
-        self.create_button(top_frame, "Clear Search", self.clear_search).pack(side=tk.LEFT, padx=6)
+        create_button(top_frame, "Search", self.refresh_student_list).pack(side=tk.LEFT, padx=6)
+        create_button(top_frame, "Clear Search", self.clear_search).pack(side=tk.LEFT, padx=6)
 
         tk.Label(top_frame, text="Filter Grade:", fg=TEXT_COLOR, bg=FRAME_BG).pack(side=tk.LEFT, padx=(20,0))
 
@@ -328,7 +861,7 @@ class StudentGradingApp:
                                       width=6)
         self.grade_box.pack(side=tk.LEFT, padx=6)
 
-        self.create_button(top_frame, "Apply Filter", self.refresh_student_list).pack(side=tk.LEFT, padx=6)
+        create_button(top_frame, "Apply Filter", self.refresh_student_list).pack(side=tk.LEFT, padx=6)
 
         # ---------------------------
         # LEFT FRAME (Student + Subjects + Export + Attendance)
@@ -370,10 +903,10 @@ class StudentGradingApp:
         button_bar = tk.Frame(left_frame, bg=FRAME_BG)
         button_bar.pack(fill=tk.X, pady=6)
 
-        self.create_button(button_bar, "Add Student", self.add_student).pack(side=tk.LEFT, padx=3)
-        self.create_button(button_bar, "Update Selected", self.update_selected_student).pack(side=tk.LEFT, padx=3)
-        self.create_button(button_bar, "Delete Selected", self.delete_selected_student).pack(side=tk.LEFT, padx=3)
-        self.create_button(button_bar, "Clear Form", self.clear_form).pack(side=tk.LEFT, padx=3)
+        create_button(button_bar, "Add Student", self.add_student).pack(side=tk.LEFT, padx=3)
+        create_button(button_bar, "Update Selected", self.update_selected_student).pack(side=tk.LEFT, padx=3)
+        create_button(button_bar, "Delete Selected", self.delete_selected_student).pack(side=tk.LEFT, padx=3)
+        create_button(button_bar, "Clear Form", self.clear_form).pack(side=tk.LEFT, padx=3)
 
         # ---------------------------
         # SUBJECTS PANEL
@@ -390,9 +923,9 @@ class StudentGradingApp:
                                        bg=ENTRY_BG, fg=ENTRY_FG, insertbackground="white")
         self.e_subject_name.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=4)
 
-        self.create_button(subj_box, "Add", self.add_subject, w=6).pack(side=tk.LEFT)
-        self.create_button(subj_box, "Edit", self.edit_subject, w=6).pack(side=tk.LEFT, padx=2)
-        self.create_button(subj_box, "Delete", self.delete_subject, w=6).pack(side=tk.LEFT)
+        create_button(subj_box, "Add", self.add_subject, w=6).pack(side=tk.LEFT)
+        create_button(subj_box, "Edit", self.edit_subject, w=6).pack(side=tk.LEFT, padx=2)
+        create_button(subj_box, "Delete", self.delete_subject, w=6).pack(side=tk.LEFT)
 
         tk.Label(left_frame, text="Subject List", fg=TEXT_COLOR,
                  bg=FRAME_BG).pack(anchor="w", pady=4)
@@ -410,8 +943,8 @@ class StudentGradingApp:
                                 fg=TEXT_COLOR, labelanchor="n")
         att_box.pack(fill=tk.X, pady=8)
 
-        self.create_button(att_box, "Mark Present Today", self.mark_present_today).pack(fill=tk.X, pady=3)
-        self.create_button(att_box, "Show Attendance %", self.show_attendance_percent).pack(fill=tk.X, pady=3)
+        create_button(att_box, "Mark Present Today", self.mark_present_today).pack(fill=tk.X, pady=3)
+        create_button(att_box, "Show Attendance %", self.show_attendance_percent).pack(fill=tk.X, pady=3)
 
         # ---------------------------
         # EXPORT PANEL
@@ -421,8 +954,11 @@ class StudentGradingApp:
                                    fg=TEXT_COLOR, labelanchor="n")
         export_box.pack(fill=tk.X, pady=8)
 
-        self.create_button(export_box, "Export CSV", self.export_visible_csv).pack(fill=tk.X, pady=3)
-        self.create_button(export_box, "Export Excel", self.export_visible_excel).pack(fill=tk.X, pady=3)
+        create_button(export_box, "Export CSV", self.export_visible_csv).pack(fill=tk.X, pady=3)
+        self.btn_export_excel = create_button(export_box, "Export Excel", self.export_visible_excel)
+        self.btn_export_excel.pack(fill=tk.X, pady=3)
+        self.lbl_export_status = tk.Label(export_box, text="", bg=FRAME_BG, fg=TEXT_COLOR)
+        self.lbl_export_status.pack(fill=tk.X)
 
         # ---------------------------
         # RIGHT SIDE — STUDENT TABLE + MARKS
@@ -458,24 +994,36 @@ class StudentGradingApp:
         self.marks_entries_frame = tk.Frame(marks_frame, bg=FRAME_BG)
         self.marks_entries_frame.pack(fill=tk.X, pady=5)
 
-        self.create_button(marks_frame, "Save Marks", self.save_marks_for_selected).pack(side=tk.LEFT, padx=5, pady=5)
-        self.create_button(marks_frame, "View Detailed Marks", self.view_detailed_marks).pack(side=tk.LEFT, padx=5, pady=5)
+        create_button(marks_frame, "Save Marks", self.save_marks_for_selected).pack(side=tk.LEFT, padx=5, pady=5)
+        create_button(marks_frame, "View Detailed Marks", self.view_detailed_marks).pack(side=tk.LEFT, padx=5, pady=5)
+
+        # Treeview rows currently shown, keyed by student db id
+        self._row_iid_by_dbid = {}
+        self._row_values_by_dbid = {}
+        self._refresh_after_id = None
+
+        # Computed student rows for the current search and grade filter,
+        # reused until either of those or the underlying data changes
+        self._summary_cache = {}
+        self._summary_key = None
+        # (search text, grade filter) the table currently shows
+        self._shown_view = ("", "All")
+
+        # Excel exports run here one at a time, polled from the Tk loop
+        self._export_pool = ThreadPoolExecutor(max_workers=1)
+        # Rows written by the running export; set by the worker, read by the poll
+        self._export_rows_written = 0
+
+        # Built once and reused; separate so a finished export cannot replace
+        # a pending exit question
+        self._confirm = ConfirmDialog(master)
+        self._info_dialog = ConfirmDialog(master)
 
         # Init
         self.refresh_subjects()
         self.refresh_student_list()
         self.selected_student_db_id = None
 
-    # ---------------------------
-    # DARK THEME BUTTON CREATOR
-    # ---------------------------
-
-    def create_button(self, parent, text, cmd, w=12):
-        btn = tk.Button(parent, text=text, width=w, command=cmd,
-                         bg=BTN_BG, fg=TEXT_COLOR, activebackground=BTN_HOVER,
-                         activeforeground=TEXT_COLOR, relief="flat", bd=2)
-        return btn
-
     # -----------------------------------------------------------
     # SUBJECT EVENTS
     # -----------------------------------------------------------
@@ -519,15 +1067,11 @@ class StudentGradingApp:
         if not new_name:
             return
 
-        conn = get_conn()
-        with closing(conn):
-            c = conn.cursor()
-            try:
-                c.execute("UPDATE subjects SET name=? WHERE id=?", (new_name, subj_id))
-                conn.commit()
-            except sqlite3.IntegrityError:
-                messagebox.showerror("Error", "Subject name already exists.")
-                return
+        try:
+            rename_subject_in_db(subj_id, new_name)
+        except sqlite3.IntegrityError:
+            messagebox.showerror("Error", "Subject name already exists.")
+            return
 
         self.refresh_subjects()
         self.refresh_student_list()
@@ -545,12 +1089,7 @@ class StudentGradingApp:
         if not messagebox.askyesno("Delete?", f"Delete subject '{name}'?\nThis removes all related marks."):
             return
 
-        conn = get_conn()
-        with closing(conn):
-            c = conn.cursor()
-            c.execute("DELETE FROM subjects WHERE id=?", (subj_id,))
-            c.execute("DELETE FROM marks WHERE subject_db_id=?", (subj_id,))
-            conn.commit()
+        delete_subject_from_db(subj_id)
 
         self.refresh_subjects()
         self.refresh_student_list()
@@ -587,32 +1126,70 @@ class StudentGradingApp:
             e.grid(row=i, column=1)
             self.marks_entry_vars[sid] = var
 
+        # One Tcl script that blanks every marks entry, so clear_form is a
+        # single interpreter call however many subjects there are
+        self._clear_marks_script = " ".join(f"set {var} {{}};"
+                                            for var in self.marks_entry_vars.values())
+
     # -----------------------------------------------------------
     # REFRESH STUDENT LIST
     # -----------------------------------------------------------
 
+    def schedule_refresh(self, delay=150):
+        # Debounce: typing only triggers one refresh once the user pauses
+        if self._refresh_after_id is not None:
+            self.master.after_cancel(self._refresh_after_id)
+        self._refresh_after_id = self.master.after(delay, self.refresh_student_list)
+
     def refresh_student_list(self):
-        for r in self.tree.get_children():
-            self.tree.delete(r)
+        if self._refresh_after_id is not None:
+            self.master.after_cancel(self._refresh_after_id)
+            self._refresh_after_id = None
 
         query = self.search_var.get().strip()
+        fg = self.filter_grade_var.get()
+        key = (query, fg, data_revision())
+        if key != self._summary_key:
+            self._summary_cache = self.compute_student_summaries(query, fg)
+            self._summary_key = key
+
+        self.sync_tree_rows(list(self._summary_cache.values()))
+        self._shown_view = (query, fg)
+
+    def compute_student_summaries(self, query, grade="All"):
+        # The grade filter runs in SQL (on idx_students_grade)
+        return {row["id"]: summary_row(row, calculate_grade_from_totals(row["total"], row["mcount"]))
+                for row in fetch_student_summary(query, grade)}
+
+    def sync_tree_rows(self, rows):
+        # Update the table in place so only new, changed, moved or removed
+        # rows cost a Tk call
+        wanted = {values[0] for values in rows}
+        stale = [db_id for db_id in self._row_iid_by_dbid if db_id not in wanted]
+        if stale:
+            self.tree.delete(*[self._row_iid_by_dbid.pop(db_id) for db_id in stale])
+            for db_id in stale:
+                del self._row_values_by_dbid[db_id]
+
+        order = list(self.tree.get_children())
+
+        for index, values in enumerate(rows):
+            db_id = values[0]
+            iid = self._row_iid_by_dbid.get(db_id)
+
+            if iid is None:
+                iid = self.tree.insert("", index, values=values)
+                order.insert(index, iid)
+                self._row_iid_by_dbid[db_id] = iid
+            else:
+                if self._row_values_by_dbid[db_id] != values:
+                    self.tree.item(iid, values=values)
+                if order[index] != iid:
+                    self.tree.move(iid, "", index)
+                    order.remove(iid)
+                    order.insert(index, iid)
 
-        if query:
-            students = find_students_by_name(query)
-        else:
-            students = list_students_from_db()
-
-        for db_id, sid, name, klass in students:
-            marks = get_marks_for_student_from_db(db_id)
-            total, max_total, percentage, gpa, grade = calculate_total_percentage_gpa_grade(marks)
-            attendance = get_attendance_percent_from_db(db_id)
-
-            fg = self.filter_grade_var.get()
-            if fg != "All" and grade != fg:
-                continue
-
-            self.tree.insert("", tk.END,
-                             values=(db_id, sid, name, klass, total, percentage, gpa, grade, attendance))
+            self._row_values_by_dbid[db_id] = values
 
     # -----------------------------------------------------------
     # STUDENT SELECT EVENT
@@ -623,8 +1200,7 @@ class StudentGradingApp:
         if not sel:
             return
 
-        item = self.tree.item(sel[0])
-        db_id, sid, name, klass = item["values"][:4]
+        db_id, sid, name, klass = self.tree.item(sel[0], "values")[:4]
 
         self.selected_student_db_id = db_id
         self.lbl_selected_student.config(text=f"{name} ({sid})")
@@ -633,14 +1209,11 @@ class StudentGradingApp:
         self.name_var.set(name)
         self.class_var.set(klass)
 
-        marks = get_marks_for_student_from_db(db_id)
-        marks_map = {sname: val for sname, val in marks}
+        marks = get_marks_by_subject_for_student(db_id)
 
-        for subj_id, subj_name in self.subjects:
-            if subj_name in marks_map:
-                self.marks_entry_vars[subj_id].set(str(marks_map[subj_name]))
-            else:
-                self.marks_entry_vars[subj_id].set("")
+        for subj_id, var in self.marks_entry_vars.items():
+            val = marks.get(subj_id)
+            var.set("" if val is None else format_mark(val))
 
     # -----------------------------------------------------------
     # STUDENT CRUD
@@ -674,7 +1247,7 @@ class StudentGradingApp:
             messagebox.showerror("Error", "Select a student.")
             return
 
-        db_id = self.tree.item(sel[0])["values"][0]
+        db_id = self.tree.item(sel[0], "values")[0]
 
         sid = self.sid_var.get().strip()
         name = self.name_var.get().strip()
@@ -700,7 +1273,7 @@ class StudentGradingApp:
             messagebox.showerror("Error", "Select a student.")
             return
 
-        db_id, sid, name = self.tree.item(sel[0])["values"][:3]
+        db_id, sid, name = self.tree.item(sel[0], "values")[:3]
 
         if not messagebox.askyesno("Delete?", f"Delete '{name}'?"):
             return
@@ -719,23 +1292,21 @@ class StudentGradingApp:
             messagebox.showerror("Error", "Select a student first.")
             return
 
+        pairs = []
+
         for subj_id, subj_name in self.subjects:
             raw = self.marks_entry_vars[subj_id].get().strip()
 
             if raw == "":
                 continue
 
-            try:
-                val = float(raw)
-            except:
-                messagebox.showerror("Error", f"Invalid marks for {subj_name}.")
+            if not _MARK_RE.match(raw):
+                messagebox.showerror("Error", f"Marks for {subj_name} must be a number from 0-100.")
                 return
 
-            if not 0 <= val <= 100:
-                messagebox.showerror("Error", f"Marks for {subj_name} must be 0-100.")
-                return
+            pairs.append((subj_id, float(raw)))
 
-            set_mark_in_db(self.selected_student_db_id, subj_id, val)
+        set_marks_bulk(self.selected_student_db_id, pairs)
 
         messagebox.showinfo("Saved", "Marks updated.")
         self.refresh_student_list()
@@ -750,11 +1321,15 @@ class StudentGradingApp:
             messagebox.showerror("Error", "Select a student.")
             return
 
-        db_id, sid, name = self.tree.item(sel[0])["values"][:3]
+        db_id, sid, name = self.tree.item(sel[0], "values")[:3]
 
+        # Graded from the stored totals, like the table; the per-subject
+        # query only supplies the lines listed below
+        summary = fetch_student_summary_by_id(db_id)
+        total, max_total, percentage, gpa, grade = \
+            calculate_grade_from_totals(summary["total"], summary["mcount"])
+        attendance = calculate_attendance_percent(summary["att_total"], summary["att_present"])
         marks = get_marks_for_student_from_db(db_id)
-        total, max_total, percentage, gpa, grade = calculate_total_percentage_gpa_grade(marks)
-        attendance = get_attendance_percent_from_db(db_id)
 
         msg = f"{name} ({sid})\n\n"
         msg += "Marks:\n"
@@ -779,12 +1354,16 @@ class StudentGradingApp:
             messagebox.showerror("Error", "Select a student.")
             return
 
-        db_id, sid, name = self.tree.item(sel[0])["values"][:3]
-
         today = datetime.date.today().isoformat()
-        add_attendance_to_db(db_id, today, True)
 
-        messagebox.showinfo("Marked", f"{name} marked present ({today}).")
+        if len(sel) == 1:
+            db_id, sid, name = self.tree.item(sel[0], "values")[:3]
+            add_attendance_to_db(db_id, today, True)
+            messagebox.showinfo("Marked", f"{name} marked present ({today}).")
+        else:
+            add_attendance_bulk((self.tree.item(i, "values")[0], today, True) for i in sel)
+            messagebox.showinfo("Marked", f"{len(sel)} students marked present ({today}).")
+
         self.refresh_student_list()
 
     def show_attendance_percent(self):
@@ -793,27 +1372,22 @@ class StudentGradingApp:
             messagebox.showerror("Error", "Select a student.")
             return
 
-        db_id = self.tree.item(sel[0])["values"][0]
+        db_id = self.tree.item(sel[0], "values")[0]
 
-        pct = get_attendance_percent_from_db(db_id)
+        summary = fetch_student_summary_by_id(db_id)
+        pct = calculate_attendance_percent(summary["att_total"], summary["att_present"])
         messagebox.showinfo("Attendance %", f"Attendance: {pct}%")
 
     # -----------------------------------------------------------
     # EXPORT
     # -----------------------------------------------------------
 
-    def get_visible_rows_for_export(self):
-        headers = ["DB_ID", "Student ID", "Name", "Class",
-                   "Total", "Percentage", "GPA", "Grade", "Attendance%"]
-
-        rows = [self.tree.item(i)["values"] for i in self.tree.get_children()]
-
-        return rows, headers
+    def iter_visible_rows(self):
+        for i in self.tree.get_children():
+            yield self.tree.item(i, "values")
 
     def export_visible_csv(self):
-        rows, headers = self.get_visible_rows_for_export()
-
-        if not rows:
+        if not self.tree.get_children():
             messagebox.showerror("Error", "No data to export.")
             return
 
@@ -822,20 +1396,16 @@ class StudentGradingApp:
         if not fp:
             return
 
-        with open(fp, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(headers)
-            writer.writerows(rows)
+        # Rows are streamed straight from the table into a large write buffer
+        with open(fp, "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+            writer = csv.writer(f, dialect="excel")
+            writer.writerow(EXPORT_HEADERS)
+            writer.writerows(self.iter_visible_rows())
 
-        messagebox.showinfo("Exported", f"CSV saved to:\n{fp}")
+        self._info_dialog.show("Exported", f"CSV saved to:\n{fp}")
 
     def export_visible_excel(self):
-        if not PANDAS_AVAILABLE:
-            messagebox.showerror("Missing", "Install pandas + openpyxl first.")
-            return
-
-        rows, headers = self.get_visible_rows_for_export()
-        if not rows:
+        if not self.tree.get_children():
             messagebox.showerror("Error", "No data to export.")
             return
 
@@ -844,10 +1414,33 @@ class StudentGradingApp:
         if not fp:
             return
 
-        df = pd.DataFrame(rows, columns=headers)
-        df.to_excel(fp, index=False)
+        # The worker re-reads the rows the table shows from the database
+        # and never touches Tk widgets
+        query, grade_filter = self._shown_view
+        self.btn_export_excel.config(state=tk.DISABLED)
+        self._export_rows_written = 0
+        self.lbl_export_status.config(text="Exporting...")
+        future = self._export_pool.submit(export_students_xlsx, fp, query, grade_filter,
+                                          self.note_export_progress)
+        self.master.after(100, self.poll_excel_export, future, fp)
+
+    def note_export_progress(self, rows_written):
+        # Called on the export worker thread; only stores the count
+        self._export_rows_written = rows_written
+
+    def poll_excel_export(self, future, fp):
+        if not future.done():
+            self.lbl_export_status.config(text=f"Exporting... {self._export_rows_written:,} rows")
+            self.master.after(100, self.poll_excel_export, future, fp)
+            return
 
-        messagebox.showinfo("Exported", f"Excel saved to:\n{fp}")
+        self.btn_export_excel.config(state=tk.NORMAL)
+        self.lbl_export_status.config(text="")
+        error = future.exception()
+        if error is not None:
+            messagebox.showerror("Export failed", str(error))
+        else:
+            self._info_dialog.show("Exported", f"Excel saved to:\n{fp}")
 
     # -----------------------------------------------------------
     # CLEAR FORM & EXIT
@@ -859,9 +1452,10 @@ class StudentGradingApp:
         self.class_var.set("")
         self.lbl_selected_student.config(text="No student selected")
         self.selected_student_db_id = None
+        self.tree.selection_set(())
 
-        for v in getattr(self, "marks_entry_vars", {}).values():
-            v.set("")
+        if self._clear_marks_script:
+            self.master.tk.eval(self._clear_marks_script)
 
     def clear_search(self):
         self.search_var.set("")
@@ -869,8 +1463,11 @@ class StudentGradingApp:
         self.refresh_student_list()
 
     def on_close(self):
-        if messagebox.askyesno("Exit", "Exit the application?"):
-            self.master.destroy()
+        self._confirm.show("Exit", "Exit the application?", on_yes=self.quit_app)
+
+    def quit_app(self):
+        close_db()
+        self.master.destroy()
 
 
 # -----------------------------------------------------------